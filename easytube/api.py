@@ -1,14 +1,18 @@
-import re
+from datetime import timedelta
 from os import PathLike
-from typing import List, Iterable, Iterator, Optional, Union
+from typing import List, Iterable, Iterator, Optional, Union, Dict, Set, Any
 
 from isodate import parse_duration, duration_isoformat, Duration
 
 from googleapiclient.discovery import Resource
 
 from easytube.resources import YouTubeResource, Thumbnail, Statistics, ItemYouTubeResource, IterableYouTubeResource, \
-    Playable
-from easytube.utils import get_playlists, get_authenticated_service, get_channels, get_playlist_videos, get_video
+    Playable, CommentThread, Summary
+from easytube.cache import open_cache
+from easytube.utils import get_playlists, get_authenticated_service, get_channels, get_playlist_videos, get_video, \
+    parse_channel_reference, get_channels_by_id, get_channel_id, iter_playlist_videos, iter_comment_threads, \
+    iter_video_comment_threads, sync_playlist, set_default_service, count_playlists, get_playlist_summary, \
+    get_playlist_video_ids, MAX_IDS_PER_REQUEST, get_videos_by_id, iter_search
 
 
 class Video(ItemYouTubeResource, Playable):
@@ -96,6 +100,18 @@ class Video(ItemYouTubeResource, Playable):
         self.__channel = Channel.from_dict(self._service, channels[0]) if channels else None
         return self.__channel
 
+    def comment_threads(self, replies: bool = False, since: str = None, prefetch: int = 0) -> Iterator[CommentThread]:
+        """ Iterate over the video comment threads, the most recent ones first.
+
+        :param replies: If all the replies of each thread are requested, otherwise only the first ones are obtained.
+        :param since: A timestamp like '2021-11-08T10:00:00Z' to stop at the threads published before it.
+        :param prefetch: The number of pages of threads to request in advance.
+        :return: An iterator with the comment threads.
+        """
+        for page in iter_comment_threads(self._service, video_id=self.id, replies=replies, since=since,
+                                         prefetch=prefetch):
+            yield from (CommentThread.from_dict(thread) for thread in page)
+
     def __init__(self, service: Resource, kind: str, id: str, etag: str, title: str, description: str,
                  published_at: str, thumbnails: List[Thumbnail], channel_id: str, channel_title: str,
                  tags: List[str], category_id: int, live_broadcast_content: str, default_audio_language: str,
@@ -132,19 +148,17 @@ class Video(ItemYouTubeResource, Playable):
     def from_dict(service: Resource, d: dict) -> Optional['Video']:
         if not d:
             return None
-        view_count = int(d['statistics']['viewCount'])
-        like_count = int(d['statistics']['likeCount'])
-        dislike_count = int(d['statistics']['dislikeCount'])
-        favorite_count = int(d['statistics']['favoriteCount'])
-        comment_count = int(d['statistics']['commentCount'])
-        statistics = Statistics(view_count=view_count, like_count=like_count, dislike_count=dislike_count,
-                                favorite_count=favorite_count, comment_count=comment_count)
+        # The counts can be hidden and the dislike count is not public anymore
+        counts = {key: int(value) for key, value in d['statistics'].items()}
+        statistics = Statistics(view_count=counts.get('viewCount'), like_count=counts.get('likeCount'),
+                                dislike_count=counts.get('dislikeCount'), favorite_count=counts.get('favoriteCount'),
+                                comment_count=counts.get('commentCount'))
         return Video(service, d['kind'], d['id'], d['etag'],
                      d['snippet']['title'], d['snippet']['description'], d['snippet']['publishedAt'],
                      [Thumbnail.from_dict(id, d) for id, d in d['snippet']['thumbnails'].items()],
-                     d['snippet']['channelId'], d['snippet']['channelTitle'], d['snippet']['tags'],
+                     d['snippet']['channelId'], d['snippet']['channelTitle'], d['snippet'].get('tags', []),
                      int(d['snippet']['categoryId']), d['snippet']['liveBroadcastContent'],
-                     d['snippet']['defaultAudioLanguage'],
+                     d['snippet'].get('defaultAudioLanguage'),
                      parse_duration(d['contentDetails']['duration']), d['contentDetails']['dimension'],
                      d['contentDetails']['definition'], d['contentDetails']['caption'].lower() == 'true',
                      d['contentDetails']['licensedContent'], d['contentDetails']['contentRating'],
@@ -152,7 +166,7 @@ class Video(ItemYouTubeResource, Playable):
                      d['status']['uploadStatus'], d['status']['privacyStatus'], d['status']['license'],
                      d['status']['embeddable'], d['status']['publicStatsViewable'], d['status']['madeForKids'],
                      statistics,
-                     d['player']['embedHtml'], d['topicDetails']['topicCategories'])
+                     d['player']['embedHtml'], d.get('topicDetails', {}).get('topicCategories', []))
 
     def __dict__(self) -> dict:
         return {
@@ -198,6 +212,14 @@ class Video(ItemYouTubeResource, Playable):
             'topicDetails': {'topicCategories': self.topic_categories}
         }
 
+    def _state(self) -> tuple:
+        return (self.kind, self.id, self.etag, self.title, self.description, self.published_at, self.thumbnails,
+                self.channel_id, self.channel_title, self.tags, self.category_id, self.live_broadcast_content,
+                self.default_audio_language, self.duration, self.dimension, self.definition, self.caption,
+                self.licensed_content, self.content_rating, self.projection, self.upload_status, self.privacy_status,
+                self.license, self.embeddable, self.public_stats_viewable, self.made_for_kids, self.statistics,
+                self.player, self.topic_categories)
+
     def __str__(self) -> str:
         return str((self.id, self.title, str(self.duration)))
 
@@ -233,11 +255,42 @@ class Playlist(IterableYouTubeResource, Playable):
         self.__localized = localized
         self.__status = status
 
+    def iter_videos(self, prefetch: int = 0) -> Iterator[Video]:
+        """ Iterate over the playlist videos without waiting for the whole playlist.
+
+        :param prefetch: The number of pages of videos to request in advance while the current one is consumed.
+        :return: An iterator with the playlist videos.
+        """
+        for page in iter_playlist_videos(self._service, self.id, prefetch=prefetch):
+            yield from (Video.from_dict(self._service, video) for video in page)
+
     def __iter__(self) -> Iterator[Video]:
-        return self.videos
+        return self.iter_videos()
+
+    def sync(self, target_video_ids: Iterable[str], num_retries: int = 3) -> Dict[str, int]:
+        """ Update the playlist to contain exactly the target videos in the target order.
+
+        Only the minimal set of deletions, movements and insertions is executed. The deletions are batched.
+
+        :param target_video_ids: The target video ids, in order.
+        :param num_retries: The maximum number of times that a failed request is retried.
+        :return: The number of executed operations of each type: 'delete', 'move' and 'insert'.
+        """
+        return sync_playlist(self._service, self.id, list(target_video_ids), num_retries)
 
     def __len__(self) -> int:
-        return len(self.videos)
+        if self.statistics.video_count is not None:
+            return int(self.statistics.video_count)
+        return len(get_playlist_video_ids(self._service, self.id))
+
+    @property
+    def summary(self) -> Summary:
+        """ The aggregated duration, statistics, licenses and definitions of the playlist videos.
+
+        The videos are not hydrated, only the needed fields are requested, and the result is memoized while the
+        playlist ETag does not change.
+        """
+        return Summary.from_dict(get_playlist_summary(self._service, self.id, self.etag))
 
     @staticmethod
     def from_dict(service: Resource, d: dict) -> 'Playlist':
@@ -274,6 +327,10 @@ class Playlist(IterableYouTubeResource, Playable):
             'player': self.player
         }
 
+    def _state(self) -> tuple:
+        return (self.kind, self.id, self.etag, self.title, self.description, self.channel_id, self.channel_title,
+                self.published_at, self.thumbnails, self.localized, self.status, self.statistics, self.player)
+
     def __str__(self) -> str:
         return f'{self.kind}{self.id, self.title, self.status}'
 
@@ -284,7 +341,15 @@ class Channel(IterableYouTubeResource):
         pass
 
     def __len__(self) -> int:
-        return len(self.playlists)
+        return len(self.__playlists) if self.__playlists is not None else count_playlists(self._service, self.id)
+
+    @property
+    def summary(self) -> Summary:
+        """ The aggregated duration, statistics, licenses and definitions of the uploaded videos. An empty summary if
+        the channel has not any uploads playlist.
+        """
+        uploads = self.uploads
+        return uploads.summary if uploads else Summary(0, timedelta(), 0, 0, 0, {}, {})
 
     @staticmethod
     def from_id(service: Resource, id: str) -> 'Channel':
@@ -296,6 +361,8 @@ class Channel(IterableYouTubeResource):
 
     @property
     def uploads(self) -> Playlist:
+        if isinstance(self.__uploads, str):
+            self.__uploads = Playlist.from_id(self._service, self.__uploads)
         return self.__uploads
 
     @property
@@ -317,9 +384,21 @@ class Channel(IterableYouTubeResource):
     def url(self) -> str:
         return f'https://www.youtube.com/channel/{self.id}'
 
+    def comment_threads(self, replies: bool = False, since: str = None, prefetch: int = 0) -> Iterator[CommentThread]:
+        """ Iterate over the comment threads of all the channel videos, the most recent ones first.
+
+        :param replies: If all the replies of each thread are requested, otherwise only the first ones are obtained.
+        :param since: A timestamp like '2021-11-08T10:00:00Z' to stop at the threads published before it.
+        :param prefetch: The number of pages of threads to request in advance.
+        :return: An iterator with the comment threads.
+        """
+        for page in iter_comment_threads(self._service, channel_id=self.id, replies=replies, since=since,
+                                         prefetch=prefetch):
+            yield from (CommentThread.from_dict(thread) for thread in page)
+
     def __init__(self, service: Resource, kind: str, id: str, etag: str, title: str, description: str, custom_url: str,
                  published_at: str, thumbnails: List[Thumbnail], statistics: Statistics, likes: str,
-                 uploads: Playlist, topics: dict) -> None:
+                 uploads: Union[Playlist, str], topics: dict) -> None:
         super().__init__(service, kind, id, etag, title, description, id, title, published_at, thumbnails, statistics)
         self.__custom_url = custom_url
         self.__likes = likes
@@ -333,11 +412,20 @@ class Channel(IterableYouTubeResource):
                        d['snippet']['customUrl'] if 'customUrl' in d['snippet'] else None, d['snippet']['publishedAt'],
                        [Thumbnail.from_dict(id, t) for id, t in d['snippet']['thumbnails'].items()],
                        Statistics.from_dict(d['statistics']), d['contentDetails']['relatedPlaylists']['likes'],
-                       Playlist.from_id(service, d['contentDetails']['relatedPlaylists']['uploads']),
-                       d['topicDetails'])
+                       d['contentDetails']['relatedPlaylists']['uploads'],
+                       d.get('topicDetails', {}))
+
+    def __iter__(self) -> Iterator[Playlist]:
+        return iter(self.playlists)
+
+    def bind(self, service: Optional[Resource]) -> None:
+        super().bind(service)
+        if isinstance(self.__uploads, Playlist):
+            self.__uploads.bind(service)
 
-    def __iter__(self) -> List[Playlist]:
-        return self.playlists
+    def _state(self) -> tuple:
+        return (self.kind, self.id, self.etag, self.title, self.description, self.custom_url, self.published_at,
+                self.thumbnails, self.statistics, self.likes, self.__uploads, self.topics)
 
     def __dict__(self) -> dict:
         return {
@@ -354,7 +442,7 @@ class Channel(IterableYouTubeResource):
             'statistics': self.statistics.__dict__(),
             'relatedPlaylists': {
                 'likes': self.likes,
-                'uploaded': self.uploads.id,
+                'uploaded': self.__uploads if isinstance(self.__uploads, str) else self.__uploads.id,
             },
             'topicDetails': self.topics
         }
@@ -365,13 +453,24 @@ class Channel(IterableYouTubeResource):
 
 class YouTube(object):
     """ A class that represents the YouTube connection. """
-    def __init__(self, client_secret_file: Union[str, PathLike, bytes], authorization: [str, PathLike, bytes]) -> None:
+    def __init__(self, client_secret_file: Union[str, PathLike, bytes], authorization: [str, PathLike, bytes],
+                 cache_file: Union[str, PathLike] = None, search_ttl: float = 24 * 3600) -> None:
         """ Create a new YouTube connection.
 
         :param client_secret_file: The secret file obtained from the
         :param authorization:
+        :param cache_file: An optional SQLite file to persist the cached data between sessions.
+        :param search_ttl: The time in seconds that the search results are cached.
         """
         self.__service = get_authenticated_service(client_secret_file, authorization)
+        self.__channel_ids = open_cache(cache_file, 'channel_ids')
+        self.__searches = open_cache(cache_file, 'searches', search_ttl)
+
+    def set_default(self) -> None:
+        """ Use this connection for the resources that are not bound to any service in this process, like the
+        resources received by a multiprocessing or concurrent.futures worker.
+        """
+        set_default_service(self.__service)
 
     def first_channel(self, user_name: str = None) -> Channel:
         return self.channels(user_name)[0]
@@ -388,12 +487,104 @@ class YouTube(object):
         return Channel.from_dict(self.__service, channels[0]) if channels else None
 
     def channel_from_url(self, url: str) -> Optional[Channel]:
-        id = re.sub(r'^.*/channel/([^/]*)(/[^/]+)?$', r'\1', url)
-        return self.channel(id)
+        return self.channels_from_urls([url])[0]
+
+    def channels_from_urls(self, urls: Iterable[str]) -> List[Optional[Channel]]:
+        """ Resolve a lot of channel references with the minimum number of requests.
+
+        The references are normalized and deduplicated, the user names and handles are translated to channel ids
+        (memoizing them in the cache table) and the channels are requested by batches of ids.
+
+        The API cannot resolve the legacy custom URLs (/c/name), so they are resolved as the handle @name. A custom
+        URL does not always match the current handle of its channel, so the result could be other channel. For that
+        reason, these translations are never memoized.
+
+        :param urls: Channel URLs (/channel/, /user/, /c/ or /@handle), @handles or bare channel ids.
+        :return: The channels in the same order than the input, None for the unknown or invalid references.
+        """
+        refs = [parse_channel_reference(url) for url in urls]
+        ids = {}
+        for ref in dict.fromkeys(ref for ref in refs if ref):
+            kind, value = ref
+            if kind == 'id':
+                ids[ref] = value
+                continue
+            if kind == 'custom':
+                ids[ref] = get_channel_id(self.__service, handle=value)
+                continue
+            key = f'{kind}:{value}'
+            ids[ref] = self.__channel_ids.get(key)
+            if ids[ref] is None:
+                ids[ref] = get_channel_id(self.__service, **{'user_name' if kind == 'username' else kind: value})
+                if ids[ref]:
+                    self.__channel_ids[key] = ids[ref]
+        found = get_channels_by_id(self.__service, (id for id in ids.values() if id))
+        channels = {id: Channel.from_dict(self.__service, d) for id, d in found.items()}
+        return [channels.get(ids[ref]) if ref else None for ref in refs]
 
     def playlist(self, id: str) -> Playlist:
         playlists = get_playlists(self.__service, playlist_id=id)
         return Playlist.from_dict(self.__service, playlists[0]) if playlists else None
 
+    def playlists(self, ids: Iterable[str]) -> List[Playlist]:
+        """ Get several playlists requesting up to 50 playlists in each call.
+
+        :param ids: The playlist ids.
+        :return: The found playlists, in the same order than the ids.
+        """
+        ids, found = list(ids), {}
+        for i in range(0, len(ids), MAX_IDS_PER_REQUEST):
+            found.update({d['id']: d for d in get_playlists(self.__service,
+                                                             playlist_id=','.join(ids[i:i + MAX_IDS_PER_REQUEST]))})
+        return [Playlist.from_dict(self.__service, found[id]) for id in ids if id in found]
+
     def video_from_id(self, id: str) -> Optional[Video]:
         return Video.from_dict(self.__service, get_video(self.__service, id))
+
+    def comment_threads(self, video_ids: Iterable[str], replies: bool = False,
+                        since: Union[str, Dict[str, str]] = None, workers: int = 4) -> Iterator[CommentThread]:
+        """ Iterate over the comment threads of several videos, requesting several videos concurrently.
+
+        :param video_ids: The video ids.
+        :param replies: If all the replies of each thread are requested, otherwise only the first ones are obtained.
+        :param since: A timestamp like '2021-11-08T10:00:00Z' to stop at the threads published before it,
+           or a dictionary with the timestamp of each video.
+        :param workers: The number of videos whose comment threads are requested at the same time.
+        :return: An iterator with the comment threads. The threads of different videos are interleaved and the videos
+           with the comments disabled are skipped.
+        """
+        for page in iter_video_comment_threads(self.__service, video_ids, workers, since=since, replies=replies):
+            yield from (CommentThread.from_dict(thread) for thread in page)
+
+    def search(self, query: str, max_results: int = 0, seen: Set[str] = None,
+               **filters: Any) -> Iterator[Union[Video, Playlist, Channel]]:
+        """ Search videos, playlists and channels.
+
+        The pages are requested lazily and cached during the search TTL, so the repeated searches do not spend
+        quota. The results are hydrated with a batched list call per page and result type.
+
+        :param query: The query.
+        :param max_results: The maximum number of results to obtain or 0 to get all of them. The results that
+           cannot be obtained, like the private or deleted videos, are skipped and they are not counted.
+        :param seen: The ids of the results to skip. The obtained results are added, so the same set can be used to
+           not repeat results between several searches.
+        :param filters: Other search.list parameters, like type='video', channelId, order or publishedAfter.
+        :return: An iterator with the videos, playlists and channels in the search order.
+        """
+        seen = set() if seen is None else seen
+        count = 0
+        for page in iter_search(self.__service, query, self.__searches, seen, **filters):
+            ids = {kind: [id for k, id in page if k == kind]
+                   for kind in ['youtube#video', 'youtube#playlist', 'youtube#channel']}
+            found = {video['id']: Video.from_dict(self.__service, video)
+                     for video in get_videos_by_id(self.__service, ids['youtube#video'])}
+            found.update({playlist.id: playlist for playlist in self.playlists(ids['youtube#playlist'])})
+            found.update({id: Channel.from_dict(self.__service, channel)
+                          for id, channel in get_channels_by_id(self.__service, ids['youtube#channel']).items()})
+            for _, id in page:
+                if id in found and id not in seen:
+                    seen.add(id)
+                    count += 1
+                    yield found[id]
+                    if max_results and count >= max_results:
+                        return
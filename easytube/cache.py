@@ -0,0 +1,87 @@
+import json
+import sqlite3
+from os import PathLike
+from threading import Lock
+from time import time
+from typing import Any, Optional, Union
+
+
+class SQLiteCache(object):
+    """ A small persistent key/value table stored in a SQLite file. Values are stored as JSON. """
+
+    def __init__(self, file: Union[str, PathLike], table: str, ttl: float = None) -> None:
+        """ Open or create the cache table.
+
+        :param file: The SQLite file where the table is stored. Use ':memory:' for a non persistent cache.
+        :param table: The table name, several caches can share the same file.
+        :param ttl: The time to live of the entries in seconds. None for entries that never expire.
+        """
+        if not table.isidentifier():
+            raise ValueError(f'Invalid cache table name: {table}')
+        self.__table = table
+        self.__ttl = ttl
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(str(file), check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, created REAL)')
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """ Get a value from the cache.
+
+        :param key: The entry key.
+        :param default: The value to return if the key is not stored or it has expired.
+        :return: The stored value or the default one.
+        """
+        with self.__lock:
+            row = self.__db.execute(f'SELECT value, created FROM {self.__table} WHERE key = ?', (key,)).fetchone()
+        if row is None or (self.__ttl is not None and row[1] + self.__ttl < time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """ Store a value in the cache, replacing the previous one if exists.
+
+        :param key: The entry key.
+        :param value: A JSON serializable value.
+        """
+        with self.__lock, self.__db:
+            self.__db.execute(f'INSERT OR REPLACE INTO {self.__table} VALUES (?, ?, ?)',
+                              (key, json.dumps(value), time()))
+
+    def update(self, d: dict) -> None:
+        """ Store several values in only one transaction.
+
+        :param d: A dictionary with the keys and values to store.
+        """
+        now = time()
+        with self.__lock, self.__db:
+            self.__db.executemany(f'INSERT OR REPLACE INTO {self.__table} VALUES (?, ?, ?)',
+                                  [(key, json.dumps(value), now) for key, value in d.items()])
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, self) is not self
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def close(self) -> None:
+        """ Close the SQLite connection. """
+        with self.__lock:
+            self.__db.close()
+
+
+def open_cache(file: Optional[Union[str, PathLike]], table: str, ttl: float = None) -> SQLiteCache:
+    """ Open a persistent cache table or an in memory one if not file is given.
+
+    :param file: The SQLite file or None.
+    :param table: The table name.
+    :param ttl: The time to live of the entries in seconds.
+    :return: The cache.
+    """
+    return SQLiteCache(file or ':memory:', table, ttl)
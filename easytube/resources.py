@@ -1,7 +1,13 @@
+import marshal
 from abc import ABCMeta, ABC, abstractmethod
-from typing import List, Iterator, Iterable
+from datetime import timedelta
+from importlib import import_module
+from typing import List, Iterator, Iterable, Optional, Any, Dict
 
 from googleapiclient.discovery import Resource
+from isodate import Duration, duration_isoformat, parse_duration
+
+from easytube.utils import get_default_service
 
 
 class YouTubeResource(ABC):
@@ -55,6 +61,9 @@ class Thumbnail(YouTubeResource):
     def from_dict(id: str, d: dict) -> 'Thumbnail':
         return Thumbnail(id, d['url'], d['width'], d['height'])
 
+    def __reduce__(self) -> tuple:
+        return Thumbnail, (self.id, self.url, self.width, self.height)
+
     def __dict__(self) -> dict:
         return {
             'url': self.url,
@@ -116,8 +125,17 @@ class Statistics(object):
 
     @staticmethod
     def from_dict(d: dict) -> 'Statistics':
-        views, subscribers, videos = int(d['viewCount']), int(d['subscriberCount']), int(d['videoCount'])
-        return Statistics(views, subscribers, d['hiddenSubscriberCount'], videos)
+        # The subscriber count is not returned when it is hidden
+        counts = {key: int(d[key]) for key in ['viewCount', 'subscriberCount', 'videoCount'] if key in d}
+        return Statistics(counts.get('viewCount'), counts.get('subscriberCount'), d.get('hiddenSubscriberCount'),
+                          counts.get('videoCount'))
+
+    def _state(self) -> tuple:
+        return (self.view_count, self.subscriber_count, self.hidden_subscriber_count, self.video_count,
+                self.like_count, self.dislike_count, self.favorite_count, self.comment_count)
+
+    def __reduce__(self) -> tuple:
+        return Statistics, self._state()
 
     def __dict__(self) -> dict:
         return {
@@ -134,6 +152,79 @@ class Statistics(object):
         return str(self)
 
 
+class Summary(object):
+    """ Aggregated data of a set of videos, like the videos of a playlist. """
+    @property
+    def video_count(self) -> int:
+        return self.__video_count
+
+    @property
+    def duration(self) -> timedelta:
+        """ The total duration of the videos. """
+        return self.__duration
+
+    @property
+    def mean_duration(self) -> timedelta:
+        return self.duration / self.video_count if self.video_count else timedelta()
+
+    @property
+    def view_count(self) -> int:
+        return self.__view_count
+
+    @property
+    def like_count(self) -> int:
+        return self.__like_count
+
+    @property
+    def comment_count(self) -> int:
+        return self.__comment_count
+
+    @property
+    def licenses(self) -> Dict[str, int]:
+        """ The number of videos of each license, for example, {'youtube': 10, 'creativeCommon': 2}. """
+        return self.__licenses
+
+    @property
+    def definitions(self) -> Dict[str, int]:
+        """ The number of videos of each definition, for example, {'hd': 10, 'sd': 2}. """
+        return self.__definitions
+
+    def __init__(self, video_count: int, duration: timedelta, view_count: int, like_count: int, comment_count: int,
+                 licenses: Dict[str, int], definitions: Dict[str, int]) -> None:
+        self.__video_count = video_count
+        self.__duration = duration
+        self.__view_count = view_count
+        self.__like_count = like_count
+        self.__comment_count = comment_count
+        self.__licenses = licenses
+        self.__definitions = definitions
+
+    @staticmethod
+    def from_dict(d: dict) -> 'Summary':
+        return Summary(d['videoCount'], timedelta(seconds=d['duration']), d['viewCount'], d['likeCount'],
+                       d['commentCount'], dict(d['licenses']), dict(d['definitions']))
+
+    def __dict__(self) -> dict:
+        return {
+            'videoCount': self.video_count,
+            'duration': self.duration.total_seconds(),
+            'viewCount': self.view_count,
+            'likeCount': self.like_count,
+            'commentCount': self.comment_count,
+            'licenses': self.licenses,
+            'definitions': self.definitions
+        }
+
+    def __reduce__(self) -> tuple:
+        return Summary.from_dict, (self.__dict__(),)
+
+    def __str__(self) -> str:
+        return str(self.__dict__())
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
 class ItemYouTubeResource(YouTubeResource):
     @property
     def etag(self) -> str:
@@ -172,10 +263,14 @@ class ItemYouTubeResource(YouTubeResource):
     def statistics(self) -> Statistics:
         return self.__statistics
 
-    def __init__(self, service: Resource, kind: str, id: str, etag: str, title: str, description: str, channel_id: str,
-                 channel_title: str, published_at: str, thumbnails: List[Thumbnail],
+    @property
+    def _service(self) -> Resource:
+        return self.__service if self.__service is not None else get_default_service()
+
+    def __init__(self, service: Optional[Resource], kind: str, id: str, etag: str, title: str, description: str,
+                 channel_id: str, channel_title: str, published_at: str, thumbnails: List[Thumbnail],
                  statistics: Statistics = Statistics()):
-        self._service = service
+        self.__service = service
         super().__init__(kind, id)
         self.__etag = etag
         self.__title = title
@@ -186,6 +281,25 @@ class ItemYouTubeResource(YouTubeResource):
         self.__thumbnails = thumbnails
         self.__statistics = statistics
 
+    def bind(self, service: Optional[Resource]) -> None:
+        """ Bind the resource to other service, for example, the service of the worker process.
+
+        :param service: The YouTube service or None to use the default service of this process.
+        """
+        self.__service = service
+
+    @abstractmethod
+    def _state(self) -> tuple:
+        """ The resource state, without the service.
+        :return: The constructor arguments after the service one.
+        """
+        pass
+
+    def __reduce__(self) -> tuple:
+        # Only the data is serialized in a compact binary format. The unpickled resources are not bound to any
+        # service, so they use the default service of the process where they are unpickled.
+        return _restore, (type(self), marshal.dumps(_encode(list(self._state()))))
+
     @abstractmethod
     def __dict__(self) -> dict:
         pass
@@ -198,6 +312,39 @@ class ItemYouTubeResource(YouTubeResource):
         return str(self)
 
 
+def _encode(value: Any) -> Any:
+    # The API data does not contain tuples, so they are used to tag the values that marshal cannot serialize
+    if isinstance(value, ItemYouTubeResource):
+        return 'resource', type(value).__module__, type(value).__qualname__, _encode(list(value._state()))
+    if isinstance(value, Thumbnail):
+        return 'thumbnail', value.id, value.url, value.width, value.height
+    if isinstance(value, Statistics):
+        return ('statistics',) + value._state()
+    if isinstance(value, (timedelta, Duration)):
+        return 'duration', duration_isoformat(value)
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, tuple):
+        return value
+    if value[0] == 'resource':
+        return getattr(import_module(value[1]), value[2])(None, *_decode(value[3]))
+    if value[0] == 'thumbnail':
+        return Thumbnail(*value[1:])
+    if value[0] == 'statistics':
+        return Statistics(*value[1:])
+    return parse_duration(value[1])
+
+
+def _restore(cls: type, data: bytes) -> 'ItemYouTubeResource':
+    return cls(None, *_decode(marshal.loads(data)))
+
+
 class IterableYouTubeResource(ItemYouTubeResource, Iterable, ABC):
     __metaclass__ = ABCMeta
 
@@ -217,3 +364,182 @@ class Playable(object):
 
     def __init__(self, player: str) -> None:
         self.__player = player
+
+
+class Comment(YouTubeResource):
+    @property
+    def etag(self) -> str:
+        return self.__etag
+
+    @property
+    def video_id(self) -> str:
+        return self.__video_id
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self.__parent_id
+
+    @property
+    def author_display_name(self) -> str:
+        return self.__author_display_name
+
+    @property
+    def author_channel_id(self) -> Optional[str]:
+        return self.__author_channel_id
+
+    @property
+    def text_display(self) -> str:
+        return self.__text_display
+
+    @property
+    def text_original(self) -> str:
+        return self.__text_original
+
+    @property
+    def like_count(self) -> int:
+        return self.__like_count
+
+    @property
+    def published_at(self) -> str:
+        return self.__published_at
+
+    @property
+    def updated_at(self) -> str:
+        return self.__updated_at
+
+    def __init__(self, id: str, etag: str, video_id: str, parent_id: Optional[str], author_display_name: str,
+                 author_channel_id: Optional[str], text_display: str, text_original: str, like_count: int,
+                 published_at: str, updated_at: str) -> None:
+        super().__init__('youtube#comment', id)
+        self.__etag = etag
+        self.__video_id = video_id
+        self.__parent_id = parent_id
+        self.__author_display_name = author_display_name
+        self.__author_channel_id = author_channel_id
+        self.__text_display = text_display
+        self.__text_original = text_original
+        self.__like_count = like_count
+        self.__published_at = published_at
+        self.__updated_at = updated_at
+
+    def __reduce__(self) -> tuple:
+        return Comment.from_dict, (self.__dict__(),)
+
+    @staticmethod
+    def from_dict(d: dict) -> 'Comment':
+        snippet = d['snippet']
+        return Comment(d['id'], d['etag'], snippet.get('videoId'), snippet.get('parentId'),
+                       snippet['authorDisplayName'], snippet.get('authorChannelId', {}).get('value'),
+                       snippet['textDisplay'], snippet['textOriginal'], int(snippet['likeCount']),
+                       snippet['publishedAt'], snippet['updatedAt'])
+
+    def __dict__(self) -> dict:
+        return {
+            'kind': self.kind,
+            'etag': self.etag,
+            'id': self.id,
+            'snippet': {
+                'videoId': self.video_id,
+                'parentId': self.parent_id,
+                'authorDisplayName': self.author_display_name,
+                'authorChannelId': {'value': self.author_channel_id},
+                'textDisplay': self.text_display,
+                'textOriginal': self.text_original,
+                'likeCount': self.like_count,
+                'publishedAt': self.published_at,
+                'updatedAt': self.updated_at
+            }
+        }
+
+    def __str__(self) -> str:
+        return f'{self.kind}[{self.id}:({self.author_display_name}, {self.published_at})]'
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class CommentThread(YouTubeResource, Iterable):
+    @property
+    def etag(self) -> str:
+        return self.__etag
+
+    @property
+    def video_id(self) -> str:
+        return self.__video_id
+
+    @property
+    def channel_id(self) -> str:
+        return self.__channel_id
+
+    @property
+    def top_level_comment(self) -> Comment:
+        return self.__top_level_comment
+
+    @property
+    def total_reply_count(self) -> int:
+        return self.__total_reply_count
+
+    @property
+    def can_reply(self) -> bool:
+        return self.__can_reply
+
+    @property
+    def is_public(self) -> bool:
+        return self.__is_public
+
+    @property
+    def replies(self) -> List[Comment]:
+        """ The thread replies. They are all of them only if they were expanded when the thread was requested.
+        :return: The reply comments.
+        """
+        return self.__replies
+
+    def __init__(self, id: str, etag: str, video_id: str, channel_id: str, top_level_comment: Comment,
+                 total_reply_count: int, can_reply: bool, is_public: bool, replies: List[Comment]) -> None:
+        super().__init__('youtube#commentThread', id)
+        self.__etag = etag
+        self.__video_id = video_id
+        self.__channel_id = channel_id
+        self.__top_level_comment = top_level_comment
+        self.__total_reply_count = total_reply_count
+        self.__can_reply = can_reply
+        self.__is_public = is_public
+        self.__replies = replies
+
+    def __reduce__(self) -> tuple:
+        return CommentThread.from_dict, (self.__dict__(),)
+
+    @staticmethod
+    def from_dict(d: dict) -> 'CommentThread':
+        snippet = d['snippet']
+        return CommentThread(d['id'], d['etag'], snippet.get('videoId'), snippet.get('channelId'),
+                             Comment.from_dict(snippet['topLevelComment']), int(snippet['totalReplyCount']),
+                             snippet['canReply'], snippet['isPublic'],
+                             [Comment.from_dict(c) for c in d.get('replies', {}).get('comments', [])])
+
+    def __iter__(self) -> Iterator[Comment]:
+        """ Iterate over all the thread comments, the top level one first. """
+        yield self.top_level_comment
+        yield from self.replies
+
+    def __dict__(self) -> dict:
+        return {
+            'kind': self.kind,
+            'etag': self.etag,
+            'id': self.id,
+            'snippet': {
+                'videoId': self.video_id,
+                'channelId': self.channel_id,
+                'topLevelComment': self.top_level_comment.__dict__(),
+                'totalReplyCount': self.total_reply_count,
+                'canReply': self.can_reply,
+                'isPublic': self.is_public
+            },
+            'replies': {'comments': [c.__dict__() for c in self.replies]}
+        }
+
+    def __str__(self) -> str:
+        return f'{self.kind}[{self.id}:({self.total_reply_count} replies)]'
+
+    def __repr__(self) -> str:
+        return str(self)
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight(object):
+    """ Coalesce concurrent identical calls: only the first caller of a key executes the function while the
+    other concurrent callers with the same key wait for it and share its result or its exception.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.__calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """ Execute a function unless other thread is already executing it with the same key.
+
+        :param key: The call key, the calls with the same key must be interchangeable.
+        :param fn: The function to execute.
+        :return: The function result, shared with all the concurrent callers with the same key.
+        """
+        with self.__lock:
+            future = self.__calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.__calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """ Same as do() but without blocking the event loop. The blocking function is executed in the default
+        executor and the calls are coalesced with the concurrent threaded calls too.
+
+        :param key: The call key, the calls with the same key must be interchangeable.
+        :param fn: The blocking function to execute.
+        :return: The function result, shared with all the concurrent callers with the same key.
+        """
+        with self.__lock:
+            future = self.__calls.get(key)
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        return await asyncio.get_running_loop().run_in_executor(None, self.do, key, fn)
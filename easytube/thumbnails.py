@@ -0,0 +1,186 @@
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, HTTPResponse
+from os import PathLike
+from tempfile import NamedTemporaryFile
+from threading import local
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urlsplit
+
+from easytube.cache import SQLiteCache
+from easytube.resources import ItemYouTubeResource, Thumbnail
+from easytube.singleflight import SingleFlight
+
+# A size policy selects the thumbnail to download from the available sizes of a resource
+SizePolicy = Callable[[List[Thumbnail]], Optional[Thumbnail]]
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 3
+
+
+def largest(max_width: int = None) -> SizePolicy:
+    """ Size policy that selects the largest thumbnail.
+
+    :param max_width: If it is given, the largest thumbnail with at most this width. If there is not any thumbnail
+       so small, nothing is downloaded for that resource.
+    :return: The size policy.
+    """
+    def policy(thumbnails: List[Thumbnail]) -> Optional[Thumbnail]:
+        candidates = [t for t in thumbnails if max_width is None or (t.width or 0) <= max_width]
+        return max(candidates, key=lambda t: t.width or 0) if candidates else None
+    return policy
+
+
+def by_id(*ids: str) -> SizePolicy:
+    """ Size policy that selects the thumbnail by its id, for example, by_id('maxres', 'high', 'default').
+
+    :param ids: The thumbnail ids in order of preference.
+    :return: The size policy.
+    """
+    def policy(thumbnails: List[Thumbnail]) -> Optional[Thumbnail]:
+        available = {t.id: t for t in thumbnails}
+        return next((available[id] for id in ids if id in available), None)
+    return policy
+
+
+class ThumbnailDownloader(object):
+    """ Download thumbnails concurrently to a content addressed cache.
+
+    The images are stored by the SHA-256 of their content, so the same image is stored only once even if it has
+    several URLs. The downloaded URLs are revalidated with conditional requests, so the unchanged images are not
+    downloaded again. The images are streamed to disk, they are never kept in memory.
+    """
+
+    def __init__(self, cache_dir: Union[str, PathLike], workers: int = 8, timeout: float = 30) -> None:
+        """ Constructor.
+
+        :param cache_dir: The cache directory.
+        :param workers: The number of concurrent downloads, each one with its own persistent connections.
+        :param timeout: The connection timeout in seconds.
+        """
+        self.__objects = os.path.join(cache_dir, 'objects')
+        os.makedirs(self.__objects, exist_ok=True)
+        self.__index = SQLiteCache(os.path.join(cache_dir, 'index.sqlite'), 'thumbnails')
+        self.__workers = workers
+        self.__timeout = timeout
+        self.__local = local()
+        self.__flight = SingleFlight()
+        # The URLs already downloaded or revalidated by this downloader
+        self.__fresh = set()
+
+    def download(self, resources: Iterable[ItemYouTubeResource],
+                 policy: SizePolicy = largest()) -> Iterator[Tuple[ItemYouTubeResource, Thumbnail, str]]:
+        """ Download the thumbnails of several videos, playlists or channels.
+
+        :param resources: The resources.
+        :param policy: The size policy, by default the largest thumbnail.
+        :return: An iterator with the resource, the selected thumbnail and the path of the downloaded image, in the
+           same order than the resources. The resources without any thumbnail selected by the policy are skipped.
+           If an image cannot be downloaded, its path is None and the other downloads continue.
+        """
+        with ThreadPoolExecutor(self.__workers) as executor:
+            pending = deque()
+            for resource in resources:
+                thumbnail = policy(resource.thumbnails)
+                if thumbnail is None:
+                    continue
+                pending.append((resource, thumbnail, executor.submit(self.fetch, thumbnail.url)))
+                # Bound the downloads waiting to be consumed
+                if len(pending) >= 2 * self.__workers:
+                    resource, thumbnail, future = pending.popleft()
+                    yield resource, thumbnail, self.__result(future)
+            while pending:
+                resource, thumbnail, future = pending.popleft()
+                yield resource, thumbnail, self.__result(future)
+
+    @staticmethod
+    def __result(future: Future) -> Optional[str]:
+        try:
+            return future.result()
+        except (HTTPException, OSError):
+            return None
+
+    def fetch(self, url: str) -> str:
+        """ Download an image if it is not cached or if it has changed.
+
+        :param url: The image URL.
+        :return: The path of the cached image.
+        """
+        # The concurrent downloads of the same URL are coalesced
+        return self.__flight.do(url, lambda: self.__fetch(url))
+
+    def __fetch(self, url: str) -> str:
+        entry = self.__index.get(url)
+        if url in self.__fresh and entry:
+            return self.__path(entry['sha256'])
+        path = self.__download(url, entry)
+        self.__fresh.add(url)
+        return path
+
+    def __download(self, url: str, entry: Optional[dict]) -> str:
+        original_url = url
+        headers = {}
+        if entry and os.path.exists(self.__path(entry['sha256'])):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('lastModified'):
+                headers['If-Modified-Since'] = entry['lastModified']
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.__request(url, headers)
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if response.status == 304:
+                response.read()
+                return self.__path(entry['sha256'])
+            if response.status != 200:
+                response.read()
+                raise HTTPException(f'{response.status} {response.reason} downloading {url}')
+            sha256 = self.__store(response)
+            self.__index[original_url] = {'sha256': sha256, 'etag': response.getheader('ETag'),
+                                          'lastModified': response.getheader('Last-Modified')}
+            return self.__path(sha256)
+        raise HTTPException(f'Too many redirects downloading {url}')
+
+    def __request(self, url: str, headers: dict) -> HTTPResponse:
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        connections = self.__local.__dict__.setdefault('connections', {})
+        key = parts.scheme, parts.netloc
+        for attempt in range(2):
+            if key not in connections:
+                connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+                connections[key] = connection_class(parts.netloc, timeout=self.__timeout)
+            try:
+                connections[key].request('GET', path, headers=headers)
+                return connections[key].getresponse()
+            except (HTTPException, ConnectionError):
+                # The persistent connection could be closed by the server, so it is opened again once
+                connections.pop(key).close()
+                if attempt:
+                    raise
+
+    def __store(self, response: HTTPResponse) -> str:
+        sha256 = hashlib.sha256()
+        with NamedTemporaryFile(dir=self.__objects, delete=False) as file:
+            try:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+                    file.write(chunk)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        path = self.__path(sha256.hexdigest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(file.name, path)
+        return sha256.hexdigest()
+
+    def __path(self, sha256: str) -> str:
+        return os.path.join(self.__objects, sha256[:2], sha256)
+
+    def close(self) -> None:
+        """ Close the cache index. """
+        self.__index.close()
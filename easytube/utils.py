@@ -1,11 +1,27 @@
+import json
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta
 from os import PathLike
-from typing import List, Union, Optional
+from random import random
+from queue import Queue, Full
+from threading import Thread, Event, Lock
+from time import sleep
+from typing import List, Union, Optional, Tuple, Iterable, Dict, Any, Iterator, Callable, Set
+from urllib.parse import urlparse, unquote
+from weakref import WeakKeyDictionary
 
-from httplib2 import Http
+from httplib2 import Http, HttpLib2Error
 from oauth2client.client import flow_from_clientsecrets
 from oauth2client.file import Storage
 from oauth2client.tools import run_flow
 from googleapiclient.discovery import build, Resource
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from isodate import parse_duration
+
+from easytube.cache import SQLiteCache
+from easytube.singleflight import SingleFlight
 
 # This OAuth 2.0 access scope allows for full read/write access to the
 # authenticated user's account.
@@ -13,6 +29,33 @@ YOUTUBE_READ_WRITE_SCOPE = "https://www.googleapis.com/auth/youtube"
 YOUTUBE_READONLY_SCOPE = "https://www.googleapis.com/auth/youtube.readonly"
 YOUTUBE_API_SERVICE_NAME = "youtube"
 YOUTUBE_API_VERSION = "v3"
+# The maximum number of ids that can be requested in only one list call.
+MAX_IDS_PER_REQUEST = 50
+MAX_RESULTS_PER_PAGE = 50
+MAX_BATCH_SIZE = 50
+# The HTTP status of the errors that can be solved retrying the request
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+CHANNEL_ID_PATTERN = re.compile(r'^UC[\w-]{22}$')
+CHANNEL_PATH_PATTERN = re.compile(r'(?:^|/)(channel|user|c)/([^/?#]+)')
+HANDLE_PATH_PATTERN = re.compile(r'(?:^|/)@([^/?#]+)')
+VIDEO_PARTS = 'id,snippet,contentDetails,player,statistics,status,topicDetails'
+# The time in seconds that the playlist summaries are memoized
+SUMMARY_TTL = 3600
+# The video fields needed to summarize a list of videos
+SUMMARY_FIELDS = 'items(contentDetails(duration,definition),statistics(viewCount,likeCount,commentCount),' \
+                 'status(license))'
+
+# The concurrent identical requests share only one in-flight request
+_requests = SingleFlight()
+# The httplib2 connections are not thread safe, so each request borrows an idle authorized Http of its service
+# Http. The idle ones are reused by any thread and they are dropped with the service Http.
+_idle_https: 'WeakKeyDictionary[Http, List[Http]]' = WeakKeyDictionary()
+_idle_https_lock = Lock()
+_END = object()
+# The service used by the resources without their own one, for example, after unpickling them in other process
+_default_service = None
+_summaries = SQLiteCache(':memory:', 'summaries', SUMMARY_TTL)
 
 
 def error_msg(client_secret_file: str) -> str:
@@ -46,10 +89,192 @@ def get_authenticated_service(client_secret_file: Union[str, PathLike, bytes],
     if credentials is None or credentials.invalid:
         credentials = run_flow(flow, storage)
 
-    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, http=credentials.authorize(Http()))
+    # The static discovery document bundled with the client does not know newer parameters like forHandle
+    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, http=credentials.authorize(Http()),
+                 static_discovery=False)
+
+
+def set_default_service(service: Optional[Resource]) -> None:
+    """ Set the service used by the resources that are not bound to any service, like the unpickled ones.
+
+    Useful as initializer of the multiprocessing or concurrent.futures workers.
+
+    :param service: The YouTube service of this process.
+    """
+    global _default_service
+    _default_service = service
+
+
+def get_default_service() -> Optional[Resource]:
+    """ Get the service used by the resources that are not bound to any service.
+
+    :return: The YouTube service or None if it was not set.
+    """
+    return _default_service
+
+
+def _execute_pooled(request: HttpRequest) -> Any:
+    http = request.http
+    credentials = getattr(getattr(http, 'request', None), 'credentials', None)
+    if credentials is None:
+        return request.execute()
+    with _idle_https_lock:
+        idle = _idle_https.setdefault(http, [])
+        pooled = idle.pop() if idle else None
+    if pooled is None:
+        pooled = credentials.authorize(Http())
+    try:
+        return request.execute(http=pooled)
+    finally:
+        with _idle_https_lock:
+            idle.append(pooled)
+
+
+def _request_key(request: HttpRequest) -> tuple:
+    # The http object is included in the key to not share the responses between different credentials
+    return id(request.http), request.method, request.uri, request.body
+
+
+def execute(request: HttpRequest) -> Any:
+    """ Execute an API request coalescing it with the identical requests that are currently in flight.
+
+    The response is shared with all the concurrent callers, so it must not be modified.
+
+    :param request: The request to execute.
+    :return: The response.
+    """
+    return _requests.do(_request_key(request), lambda: _execute_pooled(request))
+
+
+async def execute_async(request: HttpRequest) -> Any:
+    """ Execute an API request from a coroutine, coalescing it with the identical requests that are currently
+    in flight in other tasks or threads.
+
+    The response is shared with all the concurrent callers, so it must not be modified.
+
+    :param request: The request to execute.
+    :return: The response.
+    """
+    return await _requests.do_async(_request_key(request), lambda: _execute_pooled(request))
+
+
+def read_ahead(iterable: Iterable, depth: int) -> Iterator:
+    """ Consume an iterable in a background thread, keeping up to depth items ready in advance.
+
+    :param iterable: The iterable to consume.
+    :param depth: The maximum number of items waiting to be consumed.
+    :return: An iterator with the same items. The exceptions raised by the iterable are raised by this iterator.
+    """
+    return merge_ahead([iterable], 1, depth)
+
+
+def merge_ahead(iterables: Iterable[Iterable], workers: int, depth: int) -> Iterator:
+    """ Consume several iterables concurrently in background threads and merge their items.
+
+    :param iterables: The iterables to consume, they are taken as the workers become free.
+    :param workers: The number of iterables consumed at the same time.
+    :param depth: The maximum number of items waiting to be consumed.
+    :return: An iterator with the items of all the iterables. The order of the items of the same iterable is kept,
+       but the items of different iterables are interleaved. The first exception raised by any iterable stops the
+       workers and it is raised by this iterator.
+    :raise ValueError: If workers is lower than 1.
+    """
+    if workers < 1:
+        raise ValueError(f'The number of workers must be at least 1, not {workers}')
+    return _merge_ahead(iter(iterables), workers, depth)
+
+
+def _merge_ahead(iterables: Iterator[Iterable], workers: int, depth: int) -> Iterator:
+    queue, stop, lock = Queue(maxsize=depth), Event(), Lock()
+
+    def put(item: Any, error: BaseException = None) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put((item, error), timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            while True:
+                with lock:
+                    iterable = next(iterables, _END)
+                if iterable is _END:
+                    break
+                for item in iterable:
+                    if not put(item):
+                        return
+        except BaseException as e:
+            put(None, e)
+        else:
+            put(_END)
+
+    for _ in range(workers):
+        Thread(target=produce, daemon=True).start()
+    running = workers
+    try:
+        while running:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                running -= 1
+            else:
+                yield item
+    finally:
+        # Stop the producers if the consumer leaves before the end or if any of them fails
+        stop.set()
+
+
+def _pages(list_method: Callable[..., HttpRequest], params: dict, max_results: int) -> Iterator[List[dict]]:
+    count, page_token = 0, None
+    while True:
+        page_size = min(max_results - count, MAX_RESULTS_PER_PAGE) if max_results else MAX_RESULTS_PER_PAGE
+        kwargs = {'pageToken': page_token} if page_token else {}
+        response = execute(list_method(maxResults=page_size, **params, **kwargs))
+        items = response.get('items', [])[:max_results - count if max_results else None]
+        count += len(items)
+        yield items
+        page_token = response.get('nextPageToken')
+        if not page_token or not items or (max_results and count >= max_results):
+            return
+
+
+def iter_pages(list_method: Callable[..., HttpRequest], params: dict, max_results: int = 0,
+               prefetch: int = 0) -> Iterator[List[dict]]:
+    """ Iterate over the result pages of a list method.
+
+    :param list_method: The list method of a resource, for example service.playlists().list.
+    :param params: The list parameters, except maxResults and pageToken.
+    :param max_results: The maximum number of items to obtain or 0 to get all of them.
+    :param prefetch: If greater than 0, the next pages are requested in background while the current page is being
+       consumed, keeping up to this number of pages in advance.
+    :return: An iterator with the item lists of each page.
+    """
+    pages = _pages(list_method, params, max_results)
+    return read_ahead(pages, prefetch) if prefetch > 0 else pages
 
 
 def get_channels(service: Resource, user_name: str = None, channel_id: str = None, max_results: int = 0) -> List[dict]:
+    return [channel for page in iter_channels(service, user_name, channel_id, max_results) for channel in page]
+
+
+def iter_channels(service: Resource,
+                  user_name: str = None,
+                  channel_id: str = None,
+                  max_results: int = 0,
+                  prefetch: int = 0) -> Iterator[List[dict]]:
+    """ Iterate over the pages of channels of a user name, of several channel ids or of the authenticated user.
+
+    :param service: The YouTube service.
+    :param user_name: The legacy user name.
+    :param channel_id: A channel id, or several ones separated by commas.
+    :param max_results: The maximum number of channels to obtain or 0 to get all of them.
+    :param prefetch: The number of pages to request in advance, 0 to not request them in advance.
+    :return: An iterator with the channel data of each page.
+    """
     params = {'part': 'contentDetails,snippet,brandingSettings,statistics,topicDetails'}
     if user_name:
         params['forUsername'] = user_name
@@ -57,37 +282,93 @@ def get_channels(service: Resource, user_name: str = None, channel_id: str = Non
         params['id'] = channel_id
     else:
         params['mine'] = True
-    response = service.channels().list(maxResults=max_results or 50, **params).execute()
-    channels = []
-    while 'items' in response:
-        channels.extend([item for item in response['items']])
-        if 'pageToken' not in response or (max_results and max_results < len(channels)):
-            return channels
-        page_token = response['pageToken']
-        response = service.channels().list(maxResults=max_results - len(channels) if max_results else 50, **params,
-                                           pageToken=page_token).execute()
+    return iter_pages(service.channels().list, params, max_results, prefetch)
+
+
+def parse_channel_reference(ref: str) -> Optional[Tuple[str, str]]:
+    """ Normalize a channel reference.
+
+    :param ref: A channel URL (/channel/, /user/, /c/ or /@handle), an @handle or a bare channel id.
+    :return: A tuple with the reference type ('id', 'username', 'handle' or 'custom' for the legacy /c/ URLs) and
+       its normalized value, or None if the reference is not recognized.
+    """
+    ref = ref.strip()
+    if CHANNEL_ID_PATTERN.match(ref):
+        return 'id', ref
+    if ref.startswith('@'):
+        return 'handle', unquote(ref[1:]).lower()
+    path = urlparse(ref if '://' in ref else f'//{ref}').path
+    match = CHANNEL_PATH_PATTERN.search(path)
+    if match:
+        kind, value = match.group(1), unquote(match.group(2))
+        if kind == 'channel':
+            return ('id', value) if CHANNEL_ID_PATTERN.match(value) else None
+        return ('username', value.lower()) if kind == 'user' else ('custom', value.lower())
+    match = HANDLE_PATH_PATTERN.search(path)
+    return ('handle', unquote(match.group(1)).lower()) if match else None
+
+
+def get_channels_by_id(service: Resource, ids: Iterable[str]) -> Dict[str, dict]:
+    """ Get several channels requesting up to MAX_IDS_PER_REQUEST channels in each call.
+
+    :param service: The YouTube service.
+    :param ids: The channel ids. Repeated ids are only requested once.
+    :return: A dictionary with the found channel ids and their channel data.
+    """
+    ids = list(dict.fromkeys(ids))
+    params = {'part': 'contentDetails,snippet,brandingSettings,statistics,topicDetails'}
+    channels = {}
+    for i in range(0, len(ids), MAX_IDS_PER_REQUEST):
+        batch = ids[i:i + MAX_IDS_PER_REQUEST]
+        response = execute(service.channels().list(maxResults=MAX_IDS_PER_REQUEST, id=','.join(batch), **params))
+        channels.update({item['id']: item for item in response.get('items', [])})
     return channels
 
 
+def get_channel_id(service: Resource, user_name: str = None, handle: str = None) -> Optional[str]:
+    """ Get the id of a channel from its legacy user name or its handle.
+
+    :param service: The YouTube service.
+    :param user_name: The legacy user name.
+    :param handle: The channel handle with or without the initial @.
+    :return: The channel id or None if the channel does not exist.
+    """
+    if user_name:
+        response = execute(service.channels().list(part='id', forUsername=user_name, maxResults=1))
+    else:
+        response = execute(service.channels().list(part='id', forHandle=f'@{handle.lstrip("@")}', maxResults=1))
+    return response['items'][0]['id'] if response.get('items') else None
+
+
 def get_playlists(service: Resource,
                   channel_id: str = None,
                   playlist_id: str = None,
                   max_results: int = 0) -> List[dict]:
+    return [playlist for page in iter_playlists(service, channel_id, playlist_id, max_results) for playlist in page]
+
+
+def iter_playlists(service: Resource,
+                   channel_id: str = None,
+                   playlist_id: str = None,
+                   max_results: int = 0,
+                   prefetch: int = 0) -> Iterator[List[dict]]:
+    """ Iterate over the pages of playlists of a channel or the authenticated user.
+
+    :param service: The YouTube service.
+    :param channel_id: The channel id.
+    :param playlist_id: A playlist id, or several ones separated by commas.
+    :param max_results: The maximum number of playlists to obtain or 0 to get all of them.
+    :param prefetch: The number of pages to request in advance, 0 to not request them in advance.
+    :return: An iterator with the playlist data of each page.
+    """
     params = {'part': 'contentDetails,snippet,status,player,localizations'}
     if channel_id:
         params['channelId'] = channel_id
     elif playlist_id:
         params['id'] = playlist_id
-    playlists = []
-    response = service.playlists().list(maxResults=max_results or 50, **params).execute()
-    while 'items' in response:
-        playlists.extend([item for item in response['items']])
-        if 'nextPageToken' not in response or (max_results and max_results < len(playlists)):
-            return playlists
-        page_token = response['nextPageToken']
-        response = service.playlists().list(maxResults=max_results - len(playlists) if max_results else 50,
-                                            pageToken=page_token, **params).execute()
-    return playlists
+    else:
+        params['mine'] = True
+    return iter_pages(service.playlists().list, params, max_results, prefetch)
 
 
 def get_videos(service: Resource,
@@ -103,7 +384,7 @@ def get_videos(service: Resource,
     elif playlist_id:
         pass
     else:
-        return [get_video(service, id) for id in ids]
+        return get_videos_by_id(service, ids)
 
     #     response = service.videos().list(part=part, maxResults=max_results or 50, id=','.join(id))
     #     while 'items' in response:
@@ -117,26 +398,415 @@ def get_videos(service: Resource,
 
 
 def get_video(service: Resource, id: str, mine: bool = False) -> dict:
-    part = 'id,snippet,contentDetails,player,statistics,status,topicDetails'
+    part = VIDEO_PARTS
     part += ',fileDetails,processingDetails,recordingDetails,suggestions,' if mine else ''
-    videos = service.videos().list(part=part, maxResults=1, id=id).execute()
+    videos = execute(service.videos().list(part=part, maxResults=1, id=id))
     return videos['items'][0] if 'items' in videos and videos['items'] else None
 
 
+def get_videos_by_id(service: Resource, ids: Iterable[str]) -> List[dict]:
+    """ Get several videos requesting up to MAX_IDS_PER_REQUEST videos in each call.
+
+    :param service: The YouTube service.
+    :param ids: The video ids.
+    :return: The data of the found videos in the same order than the ids.
+    """
+    ids = list(ids)
+    videos = {}
+    for i in range(0, len(ids), MAX_IDS_PER_REQUEST):
+        batch = list(dict.fromkeys(ids[i:i + MAX_IDS_PER_REQUEST]))
+        response = execute(service.videos().list(part=VIDEO_PARTS, maxResults=MAX_IDS_PER_REQUEST, id=','.join(batch)))
+        videos.update({item['id']: item for item in response.get('items', [])})
+    return [videos[id] for id in ids if id in videos]
+
+
 def get_playlist_videos(service: Resource, id: str, max_results: int = 0) -> List[dict]:
-    ids = get_playlist_video_ids(service, id, max_results)
-    return get_videos(service, None, None, max_results=max_results, *ids)
+    return [video for page in iter_playlist_videos(service, id, max_results) for video in page]
+
+
+def iter_playlist_videos(service: Resource, id: str, max_results: int = 0, prefetch: int = 0) -> Iterator[List[dict]]:
+    """ Iterate over the pages of videos of a playlist.
+
+    With prefetch, the playlist items are paged in a background thread and each page of video ids is hydrated with
+    a batched videos.list call in other one, so both of them are overlapped with the consumption of the videos.
+
+    :param service: The YouTube service.
+    :param id: The playlist id.
+    :param max_results: The maximum number of videos to obtain or 0 to get all of them.
+    :param prefetch: The number of pages to request in advance, 0 to not request them in advance.
+    :return: An iterator with the video data of each page.
+    """
+    pages = (get_videos_by_id(service, ids) for ids in iter_playlist_video_ids(service, id, max_results, prefetch))
+    return read_ahead(pages, prefetch) if prefetch > 0 else pages
 
 
 def get_playlist_video_ids(service: Resource, id: str, max_results: int = 0) -> List[str]:
-    part = 'id,snippet'  #,contentDetails,status'
-    items = service.playlistItems().list(part=part, playlistId=id, maxResults=max_results or 50).execute()
-    videos = []
-    while 'items' in items:
-        videos.extend([item for item in items['items']])
-        if 'nextPageToken' not in items or (max_results and max_results < len(videos)):
-            return [v['snippet']['resourceId']['videoId'] for v in videos]
-        page_token = items['nextPageToken']
-        items = service.playlistItems().list(maxResults=max_results - len(videos) if max_results else 50,
-                                             part=part, playlistId=id, pageToken=page_token).execute()
-    return [v['snippet']['resourceId']['videoId'] for v in videos]
+    return [video_id for page in iter_playlist_video_ids(service, id, max_results) for video_id in page]
+
+
+def iter_playlist_video_ids(service: Resource, id: str, max_results: int = 0,
+                            prefetch: int = 0) -> Iterator[List[str]]:
+    """ Iterate over the pages of video ids of a playlist.
+
+    :param service: The YouTube service.
+    :param id: The playlist id.
+    :param max_results: The maximum number of video ids to obtain or 0 to get all of them.
+    :param prefetch: The number of pages to request in advance, 0 to not request them in advance.
+    :return: An iterator with the video ids of each page.
+    """
+    for page in iter_playlist_items(service, id, 'contentDetails', max_results, prefetch):
+        yield [item['contentDetails']['videoId'] for item in page]
+
+
+def iter_playlist_items(service: Resource, id: str, part: str = 'snippet', max_results: int = 0,
+                        prefetch: int = 0) -> Iterator[List[dict]]:
+    """ Iterate over the pages of items of a playlist.
+
+    :param service: The YouTube service.
+    :param id: The playlist id.
+    :param part: The playlist item parts to obtain.
+    :param max_results: The maximum number of items to obtain or 0 to get all of them.
+    :param prefetch: The number of pages to request in advance, 0 to not request them in advance.
+    :return: An iterator with the item data of each page.
+    """
+    return iter_pages(service.playlistItems().list, {'part': part, 'playlistId': id}, max_results, prefetch)
+
+
+def iter_comment_threads(service: Resource, video_id: str = None, channel_id: str = None, replies: bool = False,
+                         since: str = None, max_results: int = 0, prefetch: int = 0) -> Iterator[List[dict]]:
+    """ Iterate over the pages of comment threads of a video or related to a channel, the most recent ones first.
+
+    :param service: The YouTube service.
+    :param video_id: The video id.
+    :param channel_id: The channel id. All the threads of the channel videos are obtained.
+    :param replies: If all the replies of each thread are requested. Otherwise, only the replies included in the
+       thread (up to 5) are obtained.
+    :param since: A timestamp in the same format than the API (for example, '2021-11-08T10:00:00Z'). The paging
+       stops when a thread published at or before this time is found. Useful to only ingest the new threads.
+    :param max_results: The maximum number of threads to obtain or 0 to get all of them.
+    :param prefetch: The number of pages to request in advance, 0 to not request them in advance.
+    :return: An iterator with the thread data of each page. If the video or the channel does not exist or its
+       comments are disabled, the iterator is empty.
+    """
+    params = {'part': 'snippet,replies', 'order': 'time'}
+    if video_id:
+        params['videoId'] = video_id
+    else:
+        params['allThreadsRelatedToChannelId'] = channel_id
+    try:
+        for page in iter_pages(service.commentThreads().list, params, max_results, prefetch):
+            if since:
+                new = [t for t in page if t['snippet']['topLevelComment']['snippet']['publishedAt'] > since]
+                if len(new) < len(page):
+                    yield _expand_replies(service, new) if replies else new
+                    return
+            yield _expand_replies(service, page) if replies else page
+    except HttpError as e:
+        if not _comments_unavailable(e):
+            raise
+
+
+def _comments_unavailable(error: HttpError) -> bool:
+    # Other 403 errors, like quotaExceeded, must not be hidden
+    return error.resp.status == 404 or \
+        error.resp.status == 403 and any(d.get('reason') == 'commentsDisabled' for d in error.error_details or []
+                                          if isinstance(d, dict))
+
+
+def _expand_replies(service: Resource, threads: List[dict]) -> List[dict]:
+    # The responses are shared by the coalesced requests, so the threads are copied instead of modified
+    return [dict(thread, replies={'comments': get_comments(service, thread['id'])})
+            if thread['snippet']['totalReplyCount'] > len(thread.get('replies', {}).get('comments', []))
+            else thread for thread in threads]
+
+
+def get_comments(service: Resource, parent_id: str, max_results: int = 0) -> List[dict]:
+    """ Get the replies of a comment.
+
+    :param service: The YouTube service.
+    :param parent_id: The id of the top level comment, which is the same than the thread id.
+    :param max_results: The maximum number of replies to obtain or 0 to get all of them.
+    :return: The reply data.
+    """
+    params = {'part': 'snippet', 'parentId': parent_id}
+    return [comment for page in iter_pages(service.comments().list, params, max_results) for comment in page]
+
+
+def iter_video_comment_threads(service: Resource, video_ids: Iterable[str], workers: int = 4,
+                               since: Union[str, Dict[str, str]] = None, **kwargs) -> Iterator[List[dict]]:
+    """ Iterate over the pages of comment threads of several videos, requesting several videos concurrently.
+
+    :param service: The YouTube service.
+    :param video_ids: The video ids.
+    :param workers: The number of videos whose comment threads are requested at the same time.
+    :param since: The same timestamp for all the videos or a dictionary with the timestamp of each video.
+    :param kwargs: Other arguments for iter_comment_threads(), like replies or max_results.
+    :return: An iterator with the thread data of each page. The pages of different videos are interleaved. The
+       videos that do not exist or with the comments disabled are skipped, any other error stops the iteration.
+    """
+    threads = (iter_comment_threads(service, video_id=video_id,
+                                    since=since.get(video_id) if isinstance(since, dict) else since, **kwargs)
+               for video_id in video_ids)
+    return merge_ahead(threads, workers, workers * 2)
+
+
+def _is_retriable(error: Exception) -> bool:
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRY_STATUS
+    return isinstance(error, (HttpLib2Error, ConnectionError, TimeoutError))
+
+
+def execute_batch(service: Resource, requests: List[HttpRequest], num_retries: int = 3,
+                  ignore: Iterable[int] = ()) -> List[Any]:
+    """ Execute several requests in batches of MAX_BATCH_SIZE requests, retrying the failed ones with exponential
+    backoff. The requests are not coalesced, so this can be used for write requests.
+
+    The requests of the same batch can be executed in any order, so they must be independent of each other.
+
+    :param service: The YouTube service.
+    :param requests: The requests to execute.
+    :param num_retries: The maximum number of times that the failed requests are retried.
+    :param ignore: The HTTP status of the errors to ignore, for example 404 when deleting resources
+       that could be deleted by a previous attempt.
+    :return: The responses in the same order than the requests, None for the ignored errors.
+    :raise HttpError: If any request fails with a no retriable error or it fails after all the retries.
+       The transport errors are retried too and they are raised if they persist after all the retries.
+    """
+    responses, errors, pending, ignore = [None] * len(requests), {}, list(range(len(requests))), set(ignore)
+
+    def callback(request_id: str, response: Any, exception: Exception) -> None:
+        if exception is None:
+            responses[int(request_id)] = response
+        elif not isinstance(exception, HttpError) or exception.resp.status not in ignore:
+            errors[int(request_id)] = exception
+
+    for attempt in range(num_retries + 1):
+        if attempt:
+            sleep(random() * 2 ** attempt)
+        errors.clear()
+        for i in range(0, len(pending), MAX_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=callback)
+            for index in pending[i:i + MAX_BATCH_SIZE]:
+                batch.add(requests[index], request_id=str(index))
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole batch failed, so all its requests are retried if the error is retriable
+                if not _is_retriable(e):
+                    raise
+                errors.update({index: e for index in pending[i:i + MAX_BATCH_SIZE]})
+        fatal = [e for e in errors.values() if not _is_retriable(e)]
+        if fatal:
+            raise fatal[0]
+        pending = sorted(errors)
+        if not pending:
+            return responses
+    raise errors[pending[0]]
+
+
+def plan_playlist_sync(items: List[Tuple[str, str]], target_video_ids: List[str]) -> List[tuple]:
+    """ Calculate the minimal operations to transform a playlist into a target video list.
+
+    The items that are the longest common subsequence of the playlist and the target videos are kept, the rest of
+    the wanted items are moved, the unwanted ones are deleted and the missing videos are inserted. Each movement and
+    insertion puts the video just after its target predecessor, so the operations must be applied in order.
+
+    :param items: The current playlist items as tuples of item id and video id, in playlist order.
+    :param target_video_ids: The target video ids, in order. They can be repeated.
+    :return: A list of operations: ('delete', item_id), ('move', item_id, video_id, position)
+       and ('insert', video_id, position). The deletions are the first ones and they are independent of each other.
+    """
+    target_positions = {}
+    for position, video_id in enumerate(target_video_ids):
+        target_positions.setdefault(video_id, []).append(position)
+
+    # Longest common subsequence as the longest increasing subsequence of the target positions of each item, the
+    # positions of the same item in decreasing order to use it only once (Hunt-Szymanski)
+    pairs = [(i, position) for i, (_, video_id) in enumerate(items)
+             for position in reversed(target_positions.get(video_id, []))]
+    tails, tail_indexes, previous = [], [], [None] * len(pairs)
+    for k, (_, position) in enumerate(pairs):
+        j = bisect_left(tails, position)
+        previous[k] = tail_indexes[j - 1] if j else None
+        tails[j:j + 1], tail_indexes[j:j + 1] = [position], [k]
+    matches, k = {}, tail_indexes[-1] if tail_indexes else None
+    while k is not None:
+        matches[pairs[k][0]] = pairs[k][1]
+        k = previous[k]
+    kept = set(matches.values())
+
+    # The other items of the same videos are moved to the free target positions, the remaining ones are deleted
+    free_positions = {video_id: [p for p in positions if p not in kept]
+                      for video_id, positions in target_positions.items()}
+    operations = []
+    for i, (item_id, video_id) in enumerate(items):
+        if i not in matches:
+            if free_positions.get(video_id):
+                matches[i] = free_positions[video_id].pop(0)
+            else:
+                operations.append(('delete', item_id))
+    item_ids = {position: items[i][0] for i, position in matches.items()}
+
+    playlist = [matches[i] for i in range(len(items)) if i in matches]
+    for position, video_id in enumerate(target_video_ids):
+        if position in kept:
+            continue
+        if position in item_ids:
+            playlist.remove(position)
+        new_position = playlist.index(position - 1) + 1 if position else 0
+        playlist.insert(new_position, position)
+        operations.append(('move', item_ids[position], video_id, new_position) if position in item_ids
+                          else ('insert', video_id, new_position))
+    return operations
+
+
+def sync_playlist(service: Resource, id: str, target_video_ids: List[str], num_retries: int = 3) -> Dict[str, int]:
+    """ Update a playlist to contain exactly the target videos in the target order with the minimal set of writes.
+
+    The deletions are executed in batches. The insertions and the movements depend on the previous ones, so they
+    are executed one by one, in order.
+
+    :param service: The YouTube service.
+    :param id: The playlist id.
+    :param target_video_ids: The target video ids, in order.
+    :param num_retries: The maximum number of times that a failed deletion or movement is retried. The insertions
+       are not idempotent, so they are never retried: a failed one could have been applied and it is raised.
+    :return: The number of executed operations of each type: 'delete', 'move' and 'insert'.
+    """
+    items = [(item['id'], item['snippet']['resourceId']['videoId'])
+             for page in iter_playlist_items(service, id, 'snippet') for item in page]
+    operations = plan_playlist_sync(items, list(target_video_ids))
+    counts = {'delete': 0, 'move': 0, 'insert': 0}
+    deletions = [service.playlistItems().delete(id=op[1]) for op in operations if op[0] == 'delete']
+    execute_batch(service, deletions, num_retries, ignore=[404])
+    for op in operations:
+        counts[op[0]] += 1
+        if op[0] == 'move':
+            snippet = {'playlistId': id, 'resourceId': {'kind': 'youtube#video', 'videoId': op[2]}, 'position': op[3]}
+            service.playlistItems().update(part='snippet', body={'id': op[1], 'snippet': snippet}) \
+                .execute(num_retries=num_retries)
+        elif op[0] == 'insert':
+            snippet = {'playlistId': id, 'resourceId': {'kind': 'youtube#video', 'videoId': op[1]}, 'position': op[2]}
+            service.playlistItems().insert(part='snippet', body={'snippet': snippet}).execute()
+    return counts
+
+
+def count_playlists(service: Resource, channel_id: str) -> int:
+    """ Count the playlists of a channel with only one request and without getting them.
+
+    :param service: The YouTube service.
+    :param channel_id: The channel id.
+    :return: The number of playlists.
+    """
+    response = execute(service.playlists().list(part='id', channelId=channel_id, maxResults=1,
+                                                fields='pageInfo(totalResults)'))
+    return response['pageInfo']['totalResults']
+
+
+def summarize_videos(service: Resource, id_pages: Iterable[List[str]]) -> dict:
+    """ Aggregate the duration, the statistics, the licenses and the definitions of several videos, requesting only
+    the needed fields of up to MAX_IDS_PER_REQUEST videos in each call and without keeping them in memory.
+
+    :param service: The YouTube service.
+    :param id_pages: The video ids, in lists of up to MAX_IDS_PER_REQUEST ids.
+    :return: A dictionary with the keys 'videoCount', 'duration' (in seconds), 'viewCount', 'likeCount',
+       'commentCount', 'licenses' and 'definitions'. The last two ones contain the number of videos of each value.
+    """
+    summary = {'videoCount': 0, 'duration': 0.0, 'viewCount': 0, 'likeCount': 0, 'commentCount': 0,
+               'licenses': {}, 'definitions': {}}
+    for ids in id_pages:
+        response = execute(service.videos().list(part='contentDetails,statistics,status', id=','.join(ids),
+                                                 maxResults=MAX_IDS_PER_REQUEST, fields=SUMMARY_FIELDS))
+        for video in response.get('items', []):
+            duration = parse_duration(video['contentDetails']['duration'])
+            if not isinstance(duration, timedelta):
+                duration = duration.totimedelta(datetime.now())
+            statistics, license = video.get('statistics', {}), video['status']['license']
+            definition = video['contentDetails']['definition']
+            summary['videoCount'] += 1
+            summary['duration'] += duration.total_seconds()
+            summary['viewCount'] += int(statistics.get('viewCount', 0))
+            summary['likeCount'] += int(statistics.get('likeCount', 0))
+            summary['commentCount'] += int(statistics.get('commentCount', 0))
+            summary['licenses'][license] = summary['licenses'].get(license, 0) + 1
+            summary['definitions'][definition] = summary['definitions'].get(definition, 0) + 1
+    return summary
+
+
+def get_playlist_summary(service: Resource, id: str, etag: str = None, cache: SQLiteCache = None) -> dict:
+    """ Aggregate the videos of a playlist, see summarize_videos().
+
+    :param service: The YouTube service.
+    :param id: The playlist id.
+    :param etag: The playlist ETag. If it is given, the summary is memoized until the ETag changes or the cache TTL
+       expires, because the ETag does not change when the video statistics change.
+    :param cache: The cache for the summaries. By default, an in memory cache with a TTL of SUMMARY_TTL seconds.
+    :return: The summary dictionary.
+    """
+    cache = _summaries if cache is None else cache
+    key = json.dumps([id, etag])
+    summary = cache.get(key) if etag is not None else None
+    if summary is None:
+        summary = summarize_videos(service, iter_playlist_video_ids(service, id, prefetch=2))
+        if etag is not None:
+            cache[key] = summary
+    return summary
+
+
+def get_search_page(service: Resource, query: str, page_token: str = None, cache: SQLiteCache = None,
+                    **filters: Any) -> dict:
+    """ Get a page of search results. Each page costs 100 quota units, so the pages can be cached.
+
+    :param service: The YouTube service.
+    :param query: The query.
+    :param page_token: The page token or None for the first page.
+    :param cache: A cache with the already obtained pages, the new pages are stored in it too.
+    :param filters: Other search.list parameters, like type, channelId, order or publishedAfter.
+    :return: A dictionary with the 'items' ids ({'kind': ..., 'videoId': ...}) and the 'nextPageToken' if there are
+       more pages.
+    """
+    params = {'part': 'id', 'q': query, 'maxResults': MAX_RESULTS_PER_PAGE, **filters}
+    if page_token:
+        params['pageToken'] = page_token
+    key = json.dumps(params, sort_keys=True)
+    page = cache.get(key) if cache is not None else None
+    if page is None:
+        response = execute(service.search().list(**params))
+        page = {'items': [item['id'] for item in response.get('items', [])]}
+        if response.get('nextPageToken'):
+            page['nextPageToken'] = response['nextPageToken']
+        if cache is not None:
+            cache[key] = page
+    return page
+
+
+def iter_search(service: Resource, query: str, cache: SQLiteCache = None, seen: Set[str] = None,
+                **filters: Any) -> Iterator[List[Tuple[str, str]]]:
+    """ Iterate over the pages of search results without repeated results.
+
+    Some results can be private, deleted or blocked in the user region, so the ids are not marked as seen here: the
+    caller adds them to seen after obtaining them and it stops the iteration when it has enough results.
+
+    :param service: The YouTube service.
+    :param query: The query.
+    :param cache: A cache with the already obtained pages, see get_search_page().
+    :param seen: The ids of the results to skip. It is checked before yielding each page, so the caller can add
+       the results that it has already obtained.
+    :param filters: Other search.list parameters, like type, channelId, order or publishedAfter.
+    :return: An iterator with the results of each page as tuples of kind ('youtube#video', 'youtube#playlist' or
+       'youtube#channel') and id.
+    """
+    seen = set() if seen is None else seen
+    yielded, page_token = set(), None
+    while True:
+        page = get_search_page(service, query, page_token, cache, **filters)
+        results = []
+        for item in page['items']:
+            id = item.get('videoId') or item.get('playlistId') or item.get('channelId')
+            if id not in seen and id not in yielded:
+                yielded.add(id)
+                results.append((item['kind'], id))
+        yield results
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
@@ -1,7 +1,64 @@
+import asyncio
+import gc
+import json
+import os
+import pickle
 import unittest
+from datetime import timedelta
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from tempfile import TemporaryDirectory
+from concurrent.futures import Future
+from threading import Condition, Event, Thread
+from typing import Any, Callable
+from unittest.mock import MagicMock, patch
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
 
 from easytube import YouTube
-from easytube.utils import get_authenticated_service, get_playlist_videos
+from easytube.api import Video, Channel, Playlist
+from easytube.resources import CommentThread, Thumbnail, Statistics, Summary
+from easytube.thumbnails import ThumbnailDownloader, largest
+from easytube.singleflight import SingleFlight
+from easytube import utils
+from easytube.utils import get_authenticated_service, get_playlist_videos, parse_channel_reference, read_ahead, \
+    plan_playlist_sync, set_default_service, execute_batch, merge_ahead, iter_video_comment_threads, execute, \
+    get_playlist_summary
+from easytube.cache import SQLiteCache
+
+
+VIDEO = {
+    'kind': 'youtube#video', 'id': '1vdw1Y6bGuA', 'etag': 'e',
+    'snippet': {'title': 'Operadores de cadena de caracteres', 'description': 'Los operadores',
+                'publishedAt': '2019-10-11T10:00:13Z',
+                'thumbnails': {'default': {'url': 'https://i.ytimg.com/vi/1vdw1Y6bGuA/default.jpg',
+                                           'width': 120, 'height': 90}},
+                'channelId': 'UCo_fg5ZyCCHt75ryUUa6ebw', 'channelTitle': 'A Smart Code', 'tags': ['python'],
+                'categoryId': '28', 'liveBroadcastContent': 'none', 'defaultAudioLanguage': 'es-ES'},
+    'contentDetails': {'duration': 'PT26M12S', 'dimension': '2d', 'definition': 'hd', 'caption': 'false',
+                       'licensedContent': False, 'contentRating': {}, 'projection': 'rectangular'},
+    'status': {'uploadStatus': 'processed', 'privacyStatus': 'public', 'license': 'creativeCommon',
+               'embeddable': True, 'publicStatsViewable': True, 'madeForKids': False},
+    'statistics': {'viewCount': '109', 'likeCount': '12', 'dislikeCount': '0', 'favoriteCount': '0',
+                   'commentCount': '2'},
+    'player': {'embedHtml': '<iframe width="480" height="270"></iframe>'},
+    'topicDetails': {'topicCategories': ['https://en.wikipedia.org/wiki/Knowledge']}}
+
+
+class FakeRequest(object):
+    """ An API request whose response is computed by a function of the request parameters. """
+    def __init__(self, handler: Callable[..., Any], **params) -> None:
+        self.http, self.method, self.uri, self.body = None, 'GET', json.dumps(params, sort_keys=True), None
+        self.__handler, self.__params = handler, params
+
+    def execute(self, http: Any = None, num_retries: int = 0) -> Any:
+        return self.__handler(**self.__params)
+
+
+def http_error(status: int, reason: str) -> HttpError:
+    content = {'error': {'code': status, 'message': reason, 'errors': [{'reason': reason}]}}
+    return HttpError(Response({'status': status}), json.dumps(content).encode())
 
 
 class MyTestCase(unittest.TestCase):
@@ -79,12 +136,104 @@ class MyTestCase(unittest.TestCase):
         channel = youtube.channel_from_url('https://www.youtube.com/channel/UCo_fg5ZyCCHt75ryUUa6ebw/about')
         self.assertEqual(channel.title, 'A Smart Code')
 
+    def test_channels_from_urls(self) -> None:
+        youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
+        channels = youtube.channels_from_urls(['https://www.youtube.com/channel/UCo_fg5ZyCCHt75ryUUa6ebw/about',
+                                               'UCo_fg5ZyCCHt75ryUUa6ebw', 'not a channel'])
+        self.assertEqual(len(channels), 3)
+        self.assertEqual(channels[0].title, 'A Smart Code')
+        self.assertIs(channels[0], channels[1])
+        self.assertIsNone(channels[2])
+
+    def test_parse_channel_reference(self) -> None:
+        self.assertEqual(parse_channel_reference('https://www.youtube.com/channel/UCo_fg5ZyCCHt75ryUUa6ebw/about'),
+                         ('id', 'UCo_fg5ZyCCHt75ryUUa6ebw'))
+        self.assertEqual(parse_channel_reference(' UCo_fg5ZyCCHt75ryUUa6ebw '), ('id', 'UCo_fg5ZyCCHt75ryUUa6ebw'))
+        self.assertEqual(parse_channel_reference('youtube.com/user/GoogleDevelopers'), ('username', 'googledevelopers'))
+        self.assertEqual(parse_channel_reference('https://www.youtube.com/c/ASmartCode/videos'),
+                         ('custom', 'asmartcode'))
+        self.assertEqual(parse_channel_reference('https://www.youtube.com/@ASmartCode'), ('handle', 'asmartcode'))
+        self.assertEqual(parse_channel_reference('@ASmartCode'), ('handle', 'asmartcode'))
+        self.assertIsNone(parse_channel_reference('https://www.youtube.com/channel/invalid'))
+        self.assertIsNone(parse_channel_reference('not a channel'))
+
+    def test_channel_from_dict(self) -> None:
+        channel = Channel.from_dict(None, {
+            'kind': 'youtube#channel', 'id': 'UCo_fg5ZyCCHt75ryUUa6ebw', 'etag': 'e',
+            'snippet': {'title': 'A Smart Code', 'description': 'Canal sobre programación.',
+                        'publishedAt': '2018-12-13T14:52:41Z', 'thumbnails': {}},
+            'statistics': {'viewCount': '24000', 'hiddenSubscriberCount': True, 'videoCount': '43'},
+            'contentDetails': {'relatedPlaylists': {'likes': '', 'uploads': 'UUo_fg5ZyCCHt75ryUUa6ebw'}}})
+        self.assertTrue(channel.statistics.hidden_subscriber_count)
+        self.assertIsNone(channel.statistics.subscriber_count)
+        self.assertEqual(channel.statistics.view_count, 24000)
+        self.assertEqual(channel.statistics.video_count, 43)
+        self.assertDictEqual(channel.topics, {})
+
     def test_get_playlists(self) -> None:
         youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
         channel = youtube.channel('UCo_fg5ZyCCHt75ryUUa6ebw')
         self.assertGreaterEqual(len(channel.playlists), 4)
         self.assertEqual(youtube.playlist('PLmf8nIhY4ISvHi1tUiZqEYjEiI185nzJH').title, 'Programación')
 
+    def test_summary(self) -> None:
+        youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
+        playlist = youtube.playlists(['PLmf8nIhY4ISvHi1tUiZqEYjEiI185nzJH'])[0]
+        videos = playlist.videos
+        summary = playlist.summary
+        # The item count includes the private and deleted videos, which are not obtained
+        self.assertGreaterEqual(len(playlist), len(videos))
+        self.assertEqual(summary.video_count, len(videos))
+        self.assertEqual(summary.duration, sum((video.duration for video in videos), timedelta()))
+        self.assertEqual(sum(summary.definitions.values()), len(videos))
+        self.assertEqual(summary.licenses.get('creativeCommon', 0),
+                         len([video for video in videos if video.license == 'creativeCommon']))
+        self.assertEqual(len(youtube.channel('UCo_fg5ZyCCHt75ryUUa6ebw')),
+                         len(youtube.channel('UCo_fg5ZyCCHt75ryUUa6ebw').playlists))
+
+    def test_summary_offline(self) -> None:
+        videos = {'v1': {'contentDetails': {'duration': 'PT10M', 'definition': 'hd'}, 'status': {'license': 'youtube'},
+                         'statistics': {'viewCount': '100', 'likeCount': '10', 'commentCount': '1'}},
+                  'v2': {'contentDetails': {'duration': 'PT20M', 'definition': 'sd'},
+                         'status': {'license': 'creativeCommon'}, 'statistics': {'viewCount': '50'}},
+                  'v3': {'contentDetails': {'duration': 'PT1H', 'definition': 'hd'}, 'status': {'license': 'youtube'},
+                         'statistics': {'viewCount': '7', 'likeCount': '3', 'commentCount': '2'}}}
+        # The deleted video is in the playlist but not in the videos
+        pages = {None: (['v1', 'v2'], 'next'), 'next': (['deleted', 'v3'], None)}
+
+        def list_items(playlistId: str, pageToken: str = None, **params) -> dict:
+            ids, next_page_token = pages[pageToken]
+            response = {'items': [{'contentDetails': {'videoId': id}} for id in ids]}
+            return dict(response, nextPageToken=next_page_token) if next_page_token else response
+
+        def list_videos(id: str, fields: str, **params) -> dict:
+            return {'items': [videos[id] for id in id.split(',') if id in videos]}
+
+        service = MagicMock()
+        service.playlistItems().list.side_effect = partial(FakeRequest, list_items)
+        service.videos().list.side_effect = partial(FakeRequest, list_videos)
+        cache = SQLiteCache(':memory:', 'summaries')
+        self.addCleanup(cache.close)
+        first = get_playlist_summary(service, 'PL1', 'etag', cache)
+        summary = Summary.from_dict(first)
+        self.assertEqual(summary.video_count, 3)
+        self.assertEqual(summary.duration, timedelta(hours=1, minutes=30))
+        self.assertEqual(summary.mean_duration, timedelta(minutes=30))
+        self.assertEqual((summary.view_count, summary.like_count, summary.comment_count), (157, 13, 3))
+        self.assertDictEqual(summary.licenses, {'youtube': 2, 'creativeCommon': 1})
+        self.assertDictEqual(summary.definitions, {'hd': 2, 'sd': 1})
+        # The summary is memoized while the ETag does not change
+        service.videos().list.reset_mock()
+        self.assertDictEqual(get_playlist_summary(service, 'PL1', 'etag', cache), first)
+        service.videos().list.assert_not_called()
+        get_playlist_summary(service, 'PL1', 'other etag', cache)
+        # One call for each page of video ids
+        self.assertEqual(service.videos().list.call_count, 2)
+        channel = Channel(service, 'youtube#channel', 'UC', 'e', 'Sin vídeos', '', None, '2019-10-11T10:00:13Z', [],
+                          Statistics(), '', None, {})
+        self.assertEqual(channel.summary.video_count, 0)
+        self.assertEqual(channel.summary.mean_duration, timedelta())
+
     def test_get_videos(self) -> None:
         service = get_authenticated_service('youtube-oath2-credentials.json', 'my-oauth2.json')
         youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
@@ -96,6 +245,281 @@ class MyTestCase(unittest.TestCase):
         # self.assertGreaterEqual(playlist.num_videos, 26)
         # print(playlist.videos)
 
+    @patch('easytube.singleflight.Future')
+    def test_single_flight(self, future_class: MagicMock) -> None:
+        waiting = Condition()
+
+        class WaitedFuture(Future):
+            """ A future that notifies when other thread or task starts waiting for it. """
+            waiters = 0
+
+            def wait(self) -> None:
+                with waiting:
+                    WaitedFuture.waiters += 1
+                    waiting.notify_all()
+
+            def result(self, timeout: float = None) -> Any:
+                self.wait()
+                return super().result(timeout)
+
+            def add_done_callback(self, fn: Callable) -> None:
+                # asyncio.wrap_future() waits for the future with a done callback
+                self.wait()
+                super().add_done_callback(fn)
+
+        future_class.side_effect = WaitedFuture
+        flight, started, release, calls, results = SingleFlight(), Event(), Event(), [], []
+
+        def fetch() -> dict:
+            calls.append(1)
+            started.set()
+            release.wait()
+            return {'items': []}
+
+        leader = Thread(target=lambda: results.append(flight.do('key', fetch)))
+        leader.start()
+        started.wait()
+        waiters = [Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(4)]
+        for waiter in waiters:
+            waiter.start()
+
+        async def wait_async() -> dict:
+            return await flight.do_async('key', fetch)
+
+        async_waiter = Thread(target=lambda: results.append(asyncio.run(wait_async())))
+        async_waiter.start()
+        # Release the leader only when all the other callers are waiting for its result
+        with waiting:
+            self.assertTrue(waiting.wait_for(lambda: WaitedFuture.waiters == 5, timeout=10))
+        release.set()
+        for thread in [leader, async_waiter] + waiters:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        def fail() -> None:
+            raise ValueError('quota exceeded')
+
+        self.assertRaises(ValueError, flight.do, 'key', fail)
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+
+    def test_pooled_http(self) -> None:
+        used = []
+        credentials = MagicMock()
+        credentials.authorize.side_effect = lambda http: http
+        http = MagicMock()
+        http.request.credentials = credentials
+
+        def request(n: int) -> MagicMock:
+            request = FakeRequest(lambda: n)
+            request.http = http
+            request.execute = lambda http=None, num_retries=0: used.append(http) or n
+            return request
+
+        self.assertListEqual([execute(request(n)) for n in range(3)], [0, 1, 2])
+        # The authorized connections are reused by the next requests and dropped with the service Http
+        self.assertEqual(len(set(map(id, used))), 1)
+        self.assertEqual(credentials.authorize.call_count, 1)
+        del http, request, credentials
+        gc.collect()
+        self.assertEqual(len(utils._idle_https), 0)
+
+    def test_read_ahead(self) -> None:
+        self.assertListEqual(list(read_ahead(range(100), 3)), list(range(100)))
+
+        def fail() -> iter:
+            yield 1
+            raise ValueError('page error')
+
+        pages = read_ahead(fail(), 2)
+        self.assertEqual(next(pages), 1)
+        self.assertRaises(ValueError, next, pages)
+
+    def test_merge_ahead(self) -> None:
+        merged = list(merge_ahead([range(0, 50), range(50, 100), range(100, 150)], 2, 4))
+        self.assertListEqual(sorted(merged), list(range(150)))
+        self.assertListEqual([i for i in merged if i >= 50 and i < 100], list(range(50, 100)))
+        self.assertRaises(ValueError, merge_ahead, [range(10)], 0, 4)
+
+    def test_iter_videos(self) -> None:
+        youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
+        playlist = youtube.playlist('PLmf8nIhY4ISvHi1tUiZqEYjEiI185nzJH')
+        self.assertListEqual([video.id for video in playlist.iter_videos(prefetch=2)],
+                             [video.id for video in playlist.videos])
+
+    def test_comment_threads(self) -> None:
+        youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
+        video = youtube.video_from_id('1vdw1Y6bGuA')
+        threads = list(video.comment_threads(replies=True))
+        self.assertGreaterEqual(len(threads), 1)
+        self.assertEqual(threads[0].kind, 'youtube#commentThread')
+        self.assertEqual(threads[0].video_id, video.id)
+        self.assertTrue(all(len(thread.replies) == thread.total_reply_count for thread in threads))
+        since = threads[0].top_level_comment.published_at
+        self.assertListEqual(list(video.comment_threads(since=since)), [])
+        self.assertEqual(len(list(youtube.comment_threads([video.id, video.id], workers=2))), 2 * len(threads))
+
+    def test_plan_playlist_sync(self) -> None:
+        items = [('i1', 'A'), ('i2', 'B'), ('i3', 'C'), ('i4', 'D')]
+        self.assertListEqual(plan_playlist_sync(items, ['A', 'B', 'C', 'D']), [])
+        self.assertListEqual(plan_playlist_sync(items, ['B', 'C', 'D', 'A']), [('move', 'i1', 'A', 3)])
+        self.assertListEqual(plan_playlist_sync(items, ['D', 'A', 'X', 'C']),
+                             [('delete', 'i2'), ('move', 'i4', 'D', 0), ('insert', 'X', 2)])
+        self.assertListEqual(plan_playlist_sync(items, ['A', 'A']), [('delete', 'i2'), ('delete', 'i3'),
+                                                                      ('delete', 'i4'), ('insert', 'A', 1)])
+        # The repeated videos are paired to keep as many items as possible
+        items = [('i1', 'A'), ('i2', 'B'), ('i3', 'A')]
+        self.assertListEqual(plan_playlist_sync(items, ['B', 'A']), [('delete', 'i1')])
+        self.assertListEqual(plan_playlist_sync(items, ['A', 'A', 'B']), [('move', 'i2', 'B', 2)])
+        self.assertListEqual(plan_playlist_sync(items, ['A', 'C', 'B', 'A', 'A']),
+                             [('insert', 'C', 1), ('insert', 'A', 4)])
+
+    def test_execute_batch_retries(self) -> None:
+        batches = []
+
+        class Batch(object):
+            def __init__(self, callback) -> None:
+                self.callback, self.requests = callback, []
+
+            def add(self, request: int, request_id: str) -> None:
+                self.requests.append((request, request_id))
+
+            def execute(self) -> None:
+                batches.append(self)
+                if len(batches) == 1:
+                    raise ConnectionResetError()
+                for request, request_id in self.requests:
+                    self.callback(request_id, request * 10, None)
+
+        class Service(object):
+            def new_batch_http_request(self, callback) -> Batch:
+                return Batch(callback)
+
+        self.assertListEqual(execute_batch(Service(), [1, 2, 3], num_retries=1), [10, 20, 30])
+        self.assertEqual(len(batches), 2)
+
+    def test_comment_threads_disabled(self) -> None:
+        def list_threads(videoId: str, **params) -> dict:
+            if videoId == 'disabled':
+                raise http_error(403, 'commentsDisabled')
+            if videoId == 'missing':
+                raise http_error(404, 'videoNotFound')
+            if videoId == 'quota':
+                raise http_error(403, 'quotaExceeded')
+            return {'items': [{'id': f'{videoId}-thread'}]}
+
+        service = MagicMock()
+        service.commentThreads().list.side_effect = partial(FakeRequest, list_threads)
+        pages = iter_video_comment_threads(service, ['a', 'disabled', 'b', 'missing', 'c'], workers=2)
+        self.assertCountEqual([t['id'] for page in pages for t in page], ['a-thread', 'b-thread', 'c-thread'])
+        with self.assertRaises(HttpError):
+            list(iter_video_comment_threads(service, ['a', 'quota', 'b'], workers=2))
+
+    def test_pickle(self) -> None:
+        comment = {'id': 'c1', 'etag': 'e', 'snippet': {
+            'videoId': '1vdw1Y6bGuA', 'authorDisplayName': 'A Smart Code', 'authorChannelId': {'value': 'UC'},
+            'textDisplay': 'Hi', 'textOriginal': 'Hi', 'likeCount': 1, 'publishedAt': '2019-10-11T10:00:13Z',
+            'updatedAt': '2019-10-11T10:00:13Z'}}
+        thread = CommentThread.from_dict({'id': 'c1', 'etag': 'e', 'snippet': {
+            'videoId': '1vdw1Y6bGuA', 'channelId': 'UC', 'topLevelComment': comment, 'totalReplyCount': 0,
+            'canReply': True, 'isPublic': True}})
+        self.assertDictEqual(pickle.loads(pickle.dumps(thread)).__dict__(), thread.__dict__())
+        video = Video.from_dict(object(), VIDEO)
+        restored = pickle.loads(pickle.dumps(video))
+        self.assertDictEqual(restored.__dict__(), video.__dict__())
+        self.assertEqual(str(restored.duration), '0:26:12')
+        self.assertIsNone(restored._service)
+        set_default_service(video._service)
+        self.assertIs(restored._service, video._service)
+        set_default_service(None)
+
+    def test_thumbnail_downloader(self) -> None:
+        images, cache = TemporaryDirectory(), TemporaryDirectory()
+        self.addCleanup(images.cleanup)
+        self.addCleanup(cache.cleanup)
+        for name in ['default.jpg', 'high.jpg', 'copy.jpg']:
+            with open(os.path.join(images.name, name), 'wb') as file:
+                file.write(b'same image' if name != 'default.jpg' else b'small image')
+        responses = []
+
+        class Handler(SimpleHTTPRequestHandler):
+            def log_request(self, code: Any = '-', size: Any = '-') -> None:
+                responses.append((self.path, int(code)))
+
+        server = ThreadingHTTPServer(('localhost', 0), partial(Handler, directory=images.name))
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://localhost:{server.server_address[1]}'
+        playlist = Playlist(None, 'youtube#playlist', 'PL1', 'e', 'Programación', '', 'UC', 'A Smart Code',
+                            '2019-10-11T10:00:13Z', [Thumbnail('default', f'{url}/default.jpg', 120, 90),
+                                                     Thumbnail('high', f'{url}/high.jpg', 480, 360)],
+                            {}, 'public', Statistics(video_count=1), '')
+        other = Playlist(None, 'youtube#playlist', 'PL2', 'e', 'Copia', '', 'UC', 'A Smart Code',
+                         '2019-10-11T10:00:13Z', [Thumbnail('high', f'{url}/copy.jpg', 480, 360)],
+                         {}, 'public', Statistics(video_count=1), '')
+        missing = Playlist(None, 'youtube#playlist', 'PL3', 'e', 'Borrada', '', 'UC', 'A Smart Code',
+                           '2019-10-11T10:00:13Z', [Thumbnail('high', f'{url}/missing.jpg', 480, 360)],
+                           {}, 'public', Statistics(video_count=1), '')
+        downloader = ThumbnailDownloader(cache.name, workers=2)
+        self.addCleanup(downloader.close)
+        results = list(downloader.download([playlist, missing, other, playlist], largest(480)))
+        self.assertListEqual([(r.id, t.id) for r, t, _ in results],
+                             [('PL1', 'high'), ('PL3', 'high'), ('PL2', 'high'), ('PL1', 'high')])
+        self.assertIsNone(results[1][2])
+        self.assertEqual(len({path for _, _, path in results if path}), 1)
+        with open(results[0][2], 'rb') as file:
+            self.assertEqual(file.read(), b'same image')
+        self.assertEqual(responses.count(('/high.jpg', 200)), 1)
+        # Other downloader with the same cache revalidates the image instead of downloading it again
+        other_downloader = ThumbnailDownloader(cache.name)
+        self.addCleanup(other_downloader.close)
+        responses.clear()
+        results = list(other_downloader.download([playlist], largest(480)))
+        self.assertListEqual(responses, [('/high.jpg', 304)])
+        with open(results[0][2], 'rb') as file:
+            self.assertEqual(file.read(), b'same image')
+        results = list(other_downloader.download([playlist], largest(200)))
+        self.assertEqual(results[0][1].id, 'default')
+        self.assertListEqual(list(downloader.download([playlist], largest(100))), [])
+
+    @patch('easytube.api.get_authenticated_service')
+    def test_search_unavailable(self, get_authenticated_service: MagicMock) -> None:
+        pages = {None: (['deleted', 'v1', 'v2'], 'next'), 'next': (['v1', 'v3', 'v4'], None)}
+
+        def search(pageToken: str = None, **params) -> dict:
+            ids, next_page_token = pages[pageToken]
+            response = {'items': [{'id': {'kind': 'youtube#video', 'videoId': id}} for id in ids]}
+            return dict(response, nextPageToken=next_page_token) if next_page_token else response
+
+        def list_videos(id: str, **params) -> dict:
+            return {'items': [dict(VIDEO, id=id) for id in id.split(',') if id != 'deleted']}
+
+        service = get_authenticated_service.return_value
+        service.search().list.side_effect = partial(FakeRequest, search)
+        service.videos().list.side_effect = partial(FakeRequest, list_videos)
+        youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json')
+        seen = set()
+        # The unavailable results are not counted, so they do not reduce the number of results
+        self.assertListEqual([video.id for video in youtube.search('q', max_results=3, seen=seen)], ['v1', 'v2', 'v3'])
+        self.assertSetEqual(seen, {'v1', 'v2', 'v3'})
+        self.assertListEqual([video.id for video in youtube.search('q', seen=seen)], ['v4'])
+
+    def test_search(self) -> None:
+        with TemporaryDirectory() as cache:
+            youtube = YouTube('youtube-oath2-credentials.json', 'my-oauth2.json', os.path.join(cache, 'cache.sqlite'))
+            videos = list(youtube.search('Operadores de cadena de caracteres', max_results=5, type='video'))
+            self.assertEqual(len(videos), 5)
+            self.assertTrue(all(isinstance(video, Video) for video in videos))
+            self.assertEqual(len({video.id for video in videos}), 5)
+            self.assertListEqual([video.id for video in youtube.search('Operadores de cadena de caracteres',
+                                                                        max_results=5, type='video')],
+                                 [video.id for video in videos])
+            seen = {video.id for video in videos}
+            more = list(youtube.search('Operadores de cadena de caracteres', max_results=5, seen=seen, type='video'))
+            self.assertFalse({video.id for video in more} & {video.id for video in videos})
+
 
 if __name__ == '__main__':
     unittest.main()